@@ -1,5 +1,6 @@
 import os
 import asyncio
+import json
 import time
 from contextlib import ExitStack
 from pathlib import Path
@@ -7,6 +8,10 @@ from typing import Any, Dict, List, Optional
 
 import requests
 
+from dedup import LSHIndex, pdf_fingerprint
+from helper_v3 import classify_doc
+from postprocess import clean_markdown
+
 
 INPUT_ROOT_DIR = "tmp"
 OUTPUT_ROOT_DIR = "out_dir"
@@ -19,6 +24,20 @@ POLL_INTERVAL_SECONDS = 5
 POLL_TIMEOUT_SECONDS = 300
 REQUEST_TIMEOUT_SECONDS = 120
 
+# Skip PDFs whose first page is near-identical to one already converted or
+# queued (needs pypdf). Links and first-page signatures are kept in
+# PDF_DUPLICATES_FILE so skips and links survive across runs.
+SKIP_DUPLICATE_PDFS = False
+FIRST_PAGE_THRESHOLD = 0.9
+PDF_DUPLICATES_FILE = os.path.join(OUTPUT_ROOT_DIR, "pdf_duplicates.json")
+_first_page_index = LSHIndex(threshold=FIRST_PAGE_THRESHOLD)
+_pdf_duplicate_of: Dict[str, str] = {}
+_pdf_signatures: Dict[str, List[int]] = {}
+
+# Strip OCR boilerplate (see postprocess.py) before writing markdown. This is the
+# only cleanup pass: it needs the page breaks the raw extraction output still has.
+CLEAN_MARKDOWN = True
+
 
 def list_directories(path: str = ".") -> List[str]:
     """List directories recursively under the given path."""
@@ -29,6 +48,59 @@ def list_directories(path: str = ".") -> List[str]:
     return directories
 
 
+def _first_page_signature(input_file: Path) -> Optional[List[int]]:
+    key = str(input_file)
+    if key not in _pdf_signatures:
+        signature = pdf_fingerprint(input_file)
+        if signature is None:
+            return None
+        _pdf_signatures[key] = signature
+    return _pdf_signatures[key]
+
+
+def load_pdf_duplicates(path: str = PDF_DUPLICATES_FILE) -> None:
+    """Restore saved PDF duplicate links and first-page signatures."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as file:
+        saved = json.load(file)
+    _pdf_duplicate_of.update(saved.get("duplicate_of", {}))
+    _pdf_signatures.update(saved.get("signatures", {}))
+
+
+def save_pdf_duplicates(path: str = PDF_DUPLICATES_FILE) -> None:
+    """Persist PDF duplicate links and first-page signatures."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"duplicate_of": _pdf_duplicate_of, "signatures": _pdf_signatures}, file, indent=2)
+
+
+def index_converted_pdfs(directories: List[str]) -> None:
+    """Fingerprint PDFs that already have markdown output so new copies match them."""
+    for directory in directories:
+        output_path = Path(OUTPUT_ROOT_DIR) / Path(directory).relative_to(Path(INPUT_ROOT_DIR))
+        for input_file in Path(directory).glob("*.pdf"):
+            if not (output_path / (input_file.stem + ".md")).exists():
+                continue
+            signature = _first_page_signature(input_file)
+            if signature is not None:
+                _first_page_index.add_if_new(str(input_file), signature)
+
+
+def find_duplicate_pdf(input_file: Path) -> Optional[str]:
+    """Return the converted or queued PDF this one duplicates, recording the link."""
+    key = str(input_file)
+    if key in _pdf_duplicate_of:
+        return _pdf_duplicate_of[key]
+    signature = _first_page_signature(input_file)
+    if signature is None:
+        return None
+    original = _first_page_index.add_if_new(key, signature)
+    if original:
+        _pdf_duplicate_of[key] = original
+    return original
+
+
 def send_files(directory: Path) -> Optional[Dict[str, Any]]:
     """Submit pending PDF files in a directory for asynchronous extraction."""
     files_list = list(directory.glob("*.pdf"))
@@ -43,6 +115,11 @@ def send_files(directory: Path) -> Optional[Dict[str, Any]]:
         if target_file.exists():
             print(f"Skipping file: {input_file}")
             continue
+        if SKIP_DUPLICATE_PDFS:
+            duplicate = find_duplicate_pdf(input_file)
+            if duplicate:
+                print(f"Skipping near-duplicate {input_file} of {duplicate}")
+                continue
         print(f"Queueing {input_file}")
         pending_files.append(input_file)
 
@@ -139,6 +216,10 @@ async def poll_and_save_record(record: Dict[str, Any], output_dir: Path) -> Opti
         print(f"Record {record_id} failed: {exc}")
         return None
 
+    if CLEAN_MARKDOWN:
+        markdown, stats = clean_markdown(markdown, classify_doc(filename))
+        print(f"Cleaned {output_filename}: {stats}")
+
     destination = output_dir / output_filename
     destination.write_text(markdown, encoding="utf-8")
     print(f"Saved {destination}")
@@ -173,9 +254,16 @@ async def process_directory(directory: Path, semaphore: asyncio.Semaphore) -> st
 
 async def main(directories: List[str]) -> List[str]:
     """Process every directory concurrently."""
+    if SKIP_DUPLICATE_PDFS:
+        load_pdf_duplicates()
+        await asyncio.to_thread(index_converted_pdfs, directories)
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
     tasks = [process_directory(Path(d), semaphore) for d in directories]
-    return await asyncio.gather(*tasks)
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        if SKIP_DUPLICATE_PDFS:
+            save_pdf_duplicates()
 
 
 if __name__ == "__main__":
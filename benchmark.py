@@ -0,0 +1,444 @@
+"""Offline retrieval benchmark over a synthetic corpus built with helper_v3.
+
+Run ``python benchmark.py``. Every run generates the same fixture inputs,
+runs them through the helper_v3 pipeline, packs and indexes the result under
+each of VARIANTS, and replays a labeled query set. The fixture includes
+paraphrased questions, EN/VN variants and near-duplicate copies, so dedup,
+chunking and VI-first preference all move the numbers. The run fails when
+retrieval quality regresses beyond the tolerance against the committed
+BASELINE_FILE, or when that file is missing. After an intended change, run
+``python benchmark.py --update-baseline`` and commit the new baseline.
+"""
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import dedup
+import helper_v3
+from packed_corpus import PackedCorpus, pack_corpus
+from retrieval import Retriever, tokenize
+
+SEED = 7
+TOP_K = 5
+QUERY_REPEATS = 20
+LATENCY_RUNS = 5
+FILLER_WORDS_PER_SECTION = 80
+BASELINE_FILE = "benchmark_baseline.json"
+MAX_QUALITY_DROP = 0.02
+# Latency is machine- and load-dependent, so it is reported but not gated by
+# default. When enabled, it is compared relative to a calibration workload
+# timed in the same run.
+GATE_LATENCY = False
+MAX_RELATIVE_LATENCY_GROWTH = 1.5
+QUALITY_METRICS = (f"recall@{TOP_K}", "mrr", "vi_first")
+
+VARIANTS = {
+    "sections": {"dedup": False, "sectioned": True},
+    "sections+dedup": {"dedup": True, "sectioned": True},
+    "documents+dedup": {"dedup": True, "sectioned": False},
+}
+
+# (key, output id stem, metadata, Vietnamese topic phrase, terms, English phrase,
+#  English terms, paraphrased question). Terms keep the English keyword OCR'd
+# Vietnamese documents usually carry in parentheses.
+SEC_TOPICS = [
+    ("access-mngr", "03-ACCESS-MGMT", "Access management", "kiểm soát truy cập và mật khẩu",
+     "mật khẩu tài khoản xác thực đăng nhập password", "access control and passwords",
+     "password account authentication login", "Tôi quên password đăng nhập thì xử lý thế nào?"),
+    ("backup-mngr", "10-BACKUP-MGMT", "Backup management", "sao lưu dữ liệu",
+     "sao lưu phục hồi bản sao lưu định kỳ backup", "data backup",
+     "backup restore copy schedule", "Bao lâu thì phải chạy thử phục hồi backup?"),
+    ("incident-mngr", "14-INCIDENT-MGMT", "Incident management", "quản lý sự cố an toàn thông tin",
+     "sự cố báo cáo ứng cứu khắc phục incident", "information security incidents",
+     "incident report response remediation", "Phát hiện sự cố thì phải báo cho ai?"),
+    ("encryption-mngr", "09-ENCRYPTION-MGMT", "Encryption management", "mã hóa và quản lý khóa",
+     "mã hóa khóa bí mật chứng thư encryption", "encryption and key management",
+     "encryption secret key certificate", "Khóa bí mật được cất giữ ra sao?"),
+    ("remote-mngr", "07-REMOTE-MGMT", "Remote working", "làm việc từ xa",
+     "từ xa vpn kết nối thiết bị cá nhân remote", "remote working",
+     "remote vpn connection personal device", "Ở nhà dùng vpn có được không?"),
+    ("physical-env-mngr", "04-PHYSICAL-MGMT", "Physical security", "an toàn vật lý và thẻ nhân viên",
+     "thẻ nhân viên khách ra vào khu vực badge", "physical security and badges",
+     "badge visitor entry area", "Khách đến làm việc cần thủ tục ra vào gì?"),
+    ("supplier-mngr", "18-SUPPLIER-MGMT", "Supplier management", "quản lý nhà cung cấp",
+     "nhà cung cấp hợp đồng đánh giá bảo mật supplier", "supplier management",
+     "supplier contract assessment security", "Ký hợp đồng với đối tác cần đánh giá gì?"),
+]
+# Topics that also get an EN copy of their regulation, and topics whose
+# regulation is duplicated as a company copy.
+EN_VARIANT_TOPICS = {"access-mngr", "backup-mngr", "incident-mngr"}
+COMPANY_COPY_TOPICS = {"encryption-mngr", "remote-mngr"}
+HR_TOPICS = [
+    ("01-RECRUITMENT", "Recruitment", "tuyển dụng nhân sự", "tuyển dụng ứng viên phỏng vấn",
+     "Ứng viên phải qua mấy vòng phỏng vấn?"),
+    ("02-LEAVE", "Leave management", "nghỉ phép", "nghỉ phép ngày phép đơn xin nghỉ",
+     "Muốn xin nghỉ vài ngày thì nộp đơn ở đâu?"),
+    ("03-ONBOARDING", "Onboarding", "tiếp nhận nhân viên mới", "nhân viên mới hội nhập đào tạo ban đầu",
+     "Người mới vào công ty được đào tạo gì?"),
+    ("04-APPRAISAL", "Performance appraisal", "đánh giá hiệu quả công việc", "đánh giá kpi xếp loại",
+     "Cuối năm xếp loại kpi như thế nào?"),
+]
+# Neutral vocabulary shared by every document so topic terms have to win on BM25.
+FILLER_VI = (
+    "công ty bộ phận trách nhiệm áp dụng thực hiện tài liệu phê duyệt phạm vi "
+    "mục đích định nghĩa hồ sơ lưu trữ kiểm tra giám sát cập nhật phiên bản"
+).split()
+FILLER_EN = (
+    "company department responsibility apply implement document approve scope "
+    "purpose definition record retain review monitor update version"
+).split()
+# Outcome patterns from assets/agent_expected_output.txt.
+UNDOCUMENTED_QUERIES = [
+    "Quy định về sử dụng drone trong khuôn viên là gì?",
+    "Chính sách hỗ trợ chi phí gửi xe ô tô như thế nào?",
+]
+OUT_OF_SCOPE_QUERIES = [
+    "Thực đơn căng tin tuần này có món gì?",
+    "Lịch bảo trì thang máy tòa nhà khi nào?",
+]
+
+
+def _body_vi(title: str, phrase: str, terms: str, rng: random.Random) -> str:
+    def filler() -> str:
+        return " ".join(rng.choice(FILLER_VI) for _ in range(FILLER_WORDS_PER_SECTION))
+
+    return (
+        f"# {title}\n\n"
+        f"## 1. Mục đích\nTài liệu quy định về {phrase}. {filler()}\n\n"
+        f"## 2. Nội dung\nYêu cầu: {terms}. {filler()}\n\n"
+        f"## 3. Trách nhiệm\n{filler()}\n"
+    )
+
+
+def _body_en(title: str, phrase: str, terms: str, rng: random.Random) -> str:
+    def filler() -> str:
+        return " ".join(rng.choice(FILLER_EN) for _ in range(FILLER_WORDS_PER_SECTION))
+
+    return (
+        f"# {title}\n\n"
+        f"## 1. Purpose\nThis document regulates {phrase}. {filler()}\n\n"
+        f"## 2. Requirements\nRequirements: {terms}. {filler()}\n\n"
+        f"## 3. Responsibilities\n{filler()}\n"
+    )
+
+
+def build_fixture_inputs(
+    input_dir: Path,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, str], Dict[str, str]]:
+    """Write synthetic extracted markdown plus a config in iso-implementation.json shape.
+
+    Returns the config, the labeled documented-answer queries, the answer group
+    of every doc_id (EN variants and copies share the group of their VN
+    original) and the language of every doc_id.
+    """
+    rng = random.Random(SEED)
+    queries: List[Dict[str, Any]] = []
+    groups: Dict[str, str] = {}
+    languages: Dict[str, str] = {}
+
+    def write(name: str, text: str) -> str:
+        (input_dir / name).write_text(text, encoding="utf-8")
+        return name
+
+    def add(doc_id: str, group: Optional[str] = None, lang: str = "vi") -> str:
+        groups[doc_id] = group or doc_id
+        languages[doc_id] = lang
+        return doc_id
+
+    handbooks = {
+        "corporate": [{
+            "metadata": "Corporate security handbook",
+            "output": f"{add('SEC-HB-CORP-GENERAL-GROUP-POLICY-VN')}.md",
+            "input": write("corp-policy-vn.md", _body_vi(
+                "Chính sách An toàn Thông tin Tập đoàn", "chính sách an toàn thông tin tập đoàn",
+                "tập đoàn chính sách tổng thể", rng)),
+            "lang": "vi",
+        }],
+        "company": [{
+            "metadata": "Company security handbook",
+            "output": f"{add('SEC-HB-COMP-HANDBOOK')}.md",
+            "input": write("company-handbook.md", _body_vi(
+                "Sổ tay An toàn Thông tin Công ty", "sổ tay an toàn thông tin công ty",
+                "sổ tay nguyên tắc chung", rng)),
+        }],
+    }
+
+    regulations: Dict[str, List[Dict[str, Any]]] = {}
+    for key, stem, metadata, phrase, terms, en_phrase, en_terms, paraphrase in SEC_TOPICS:
+        reg_id, proc_id, guide_id = f"SEC-REG-{stem}", f"SEC-PROC-{stem}", f"SEC-GUIDE-{stem}"
+        for doc_id in (reg_id, proc_id, guide_id):
+            add(doc_id)
+        reg_body = _body_vi(f"Quy định {phrase}", phrase, terms, rng)
+        regulations[key] = [{
+            "metadata": metadata,
+            "output": f"{reg_id}.md",
+            "input": write(f"{reg_id}.in.md", reg_body),
+            "lang": "vi",
+            "processes": [{
+                "output": f"{proc_id}.md",
+                "input": write(f"{proc_id}.in.md", _body_vi(f"Quy trình {phrase}", phrase, terms, rng)),
+            }],
+            "guidelines": [{
+                "output": f"{guide_id}.md",
+                "input": write(f"{guide_id}.in.md", _body_vi(f"Hướng dẫn {phrase}", phrase, terms, rng)),
+            }],
+        }]
+        if key in EN_VARIANT_TOPICS:
+            en_id = add(f"{reg_id}-EN", reg_id, "en")
+            regulations[key].append({
+                "metadata": metadata,
+                "output": f"{en_id}.md",
+                "input": write(f"{en_id}.in.md", _body_en(f"Regulation on {en_phrase}", en_phrase, en_terms, rng)),
+                "lang": "en",
+            })
+        if key in COMPANY_COPY_TOPICS:
+            copy_id = add(f"{reg_id}-COMPANY", reg_id)
+            regulations[key].append({
+                "metadata": metadata,
+                "output": f"{copy_id}.md",
+                "input": write(f"{copy_id}.in.md", "Bản sao áp dụng tại Công ty.\n\n" + reg_body),
+                "lang": "vi",
+            })
+        relevant = [reg_id, proc_id, guide_id]
+        queries.append({"question": f"Quy định về {phrase} yêu cầu gì?", "relevant": relevant})
+        queries.append({"question": paraphrase, "relevant": relevant})
+
+    hr_processes = []
+    for stem, metadata, phrase, terms, paraphrase in HR_TOPICS:
+        proc_id = add(f"HR-PROC-{stem}")
+        hr_processes.append({
+            "metadata": metadata,
+            "output": f"{proc_id}.md",
+            "input": write(f"{proc_id}.in.md", _body_vi(f"Quy trình {phrase}", phrase, terms, rng)),
+            "lang": "vi",
+        })
+        queries.append({"question": f"Quy trình {phrase} gồm những bước nào?", "relevant": [proc_id]})
+        queries.append({"question": paraphrase, "relevant": [proc_id]})
+    jd_id = add("HR-JD-SECURITY-MANAGER", lang="en")
+    job_descriptions = [{
+        "output": f"{jd_id}.md",
+        "input": write(f"{jd_id}.in.md", _body_vi(
+            "Mô tả công việc Security Manager", "mô tả công việc quản lý an ninh",
+            "security manager nhiệm vụ quyền hạn", rng)),
+    }]
+    queries.append({"question": "Nhiệm vụ của Security Manager là gì?", "relevant": [jd_id]})
+
+    config = {
+        "security": {"handbooks": handbooks, "regulations": regulations},
+        "hr": {"processes": hr_processes, "job_description": job_descriptions},
+    }
+    return config, queries, groups, languages
+
+
+def build_corpus(config: Dict[str, Any], input_dir: Path, out_dir: Path) -> None:
+    """Run the helper_v3 pipeline the same way its __main__ does."""
+    security = config["security"]
+    input_path = str(input_dir)
+    helper_v3.process_corp_handbooks(
+        security["handbooks"], out_dir=str(out_dir / "security/handbooks"), input_dir=input_path)
+    helper_v3.process_comp_handbooks(
+        security["handbooks"], out_dir=str(out_dir / "security/handbooks"), input_dir=input_path)
+    helper_v3.process_regulations(
+        security["regulations"], out_dir=str(out_dir / "security/regulations"), input_dir=input_path)
+    helper_v3.process_hr(config["hr"], out_dir=str(out_dir / "hr"), input_dir=input_path)
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _calibration_ms() -> float:
+    """Time a fixed tokenize-and-count workload to normalize latencies across machines."""
+    text = " ".join(FILLER_VI * 200)
+    samples = []
+    for _ in range(LATENCY_RUNS):
+        start = time.perf_counter()
+        for _ in range(5):
+            counts: Dict[str, int] = {}
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + 1
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _ranked(retriever: Retriever, question: str) -> Tuple[List[str], float]:
+    chunks = retriever.search(question, k=TOP_K * 4)
+    doc_ids: List[str] = []
+    for chunk in chunks:
+        if chunk.doc_id not in doc_ids:
+            doc_ids.append(chunk.doc_id)
+    return doc_ids[:TOP_K], chunks[0].score if chunks else 0.0
+
+
+def evaluate(
+    retriever: Retriever,
+    queries: List[Dict[str, Any]],
+    groups: Dict[str, str],
+    languages: Dict[str, str],
+) -> Dict[str, float]:
+    """Score answer groups: a hit on any copy of a document counts once for its group."""
+    recalls, reciprocal_ranks, redundant, vi_first = [], [], [], []
+    documented_scores = []
+    variant_groups = {group for doc_id, group in groups.items() if doc_id != group}
+    for query in queries:
+        doc_ids, top_score = _ranked(retriever, query["question"])
+        documented_scores.append(top_score)
+        relevant = set(query["relevant"])
+        hit_groups: Dict[str, str] = {}
+        first_rank = None
+        extra = 0
+        for rank, doc_id in enumerate(doc_ids, 1):
+            group = groups.get(doc_id, doc_id)
+            if group in hit_groups:
+                extra += 1
+                continue
+            hit_groups[group] = doc_id
+            if group in relevant and first_rank is None:
+                first_rank = rank
+        recalls.append(len(relevant.intersection(hit_groups)) / len(relevant))
+        reciprocal_ranks.append(1 / first_rank if first_rank else 0.0)
+        redundant.append(extra)
+        for group in relevant.intersection(hit_groups, variant_groups):
+            vi_first.append(1.0 if languages.get(hit_groups[group]) == "vi" else 0.0)
+
+    latency_runs = []
+    for _ in range(LATENCY_RUNS):
+        latencies = []
+        for query in queries:
+            for _ in range(QUERY_REPEATS):
+                start = time.perf_counter()
+                retriever.search(query["question"], k=TOP_K * 4)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latency_runs.append((_percentile(latencies, 50), _percentile(latencies, 99)))
+
+    def mean_top_score(questions: List[str]) -> float:
+        return statistics.mean(_ranked(retriever, q)[1] for q in questions)
+
+    return {
+        f"recall@{TOP_K}": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        f"redundant_hits@{TOP_K}": statistics.mean(redundant),
+        "vi_first": statistics.mean(vi_first) if vi_first else 1.0,
+        "p50_ms": statistics.median(run[0] for run in latency_runs),
+        "p99_ms": statistics.median(run[1] for run in latency_runs),
+        # Score margins show how far an abstain threshold could sit from real answers.
+        "top_score_documented": statistics.mean(documented_scores),
+        "top_score_undocumented": mean_top_score(UNDOCUMENTED_QUERIES),
+        "top_score_out_of_scope": mean_top_score(OUT_OF_SCOPE_QUERIES),
+    }
+
+
+def run_variant(
+    out_dir: Path,
+    work_dir: Path,
+    name: str,
+    options: Dict[str, bool],
+    fixture: Tuple[List[Dict[str, Any]], Dict[str, str], Dict[str, str]],
+) -> Dict[str, float]:
+    queries, groups, languages = fixture
+    pack_file = work_dir / f"{name}.pack"
+    duplicates_file = work_dir / "duplicates.json"
+    if options["dedup"] and not duplicates_file.exists():
+        duplicates_file.write_text(json.dumps(dedup.build_report(str(out_dir))), encoding="utf-8")
+    documents = pack_corpus(
+        str(out_dir),
+        str(pack_file),
+        str(duplicates_file if options["dedup"] else work_dir / "no-duplicates.json"),
+    )
+    with PackedCorpus(str(pack_file)) as corpus:
+        # Dedup must keep the originals that processes and guidelines link to.
+        dropped = sorted(doc_id for doc_id, group in groups.items() if doc_id == group and doc_id not in corpus)
+        if dropped:
+            raise RuntimeError(f"{name}: original documents missing from the pack: {dropped}")
+        start = time.perf_counter()
+        retriever = Retriever(corpus, sectioned=options["sectioned"])
+        index_seconds = time.perf_counter() - start
+
+        # Separate pass: tracemalloc slows down the code it traces.
+        tracemalloc.start()
+        measured = Retriever(corpus, sectioned=options["sectioned"])
+        index_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del measured
+
+        results = {
+            "documents": documents,
+            "sections": len(retriever.sections),
+            "index_build_s": index_seconds,
+            "index_memory_kb": index_bytes / 1024,
+        }
+        results.update(evaluate(retriever, queries, groups, languages))
+    return results
+
+
+def run() -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        input_dir, out_dir = tmp_path / "input", tmp_path / "rag"
+        input_dir.mkdir()
+        config, queries, groups, languages = build_fixture_inputs(input_dir)
+
+        start = time.perf_counter()
+        build_corpus(config, input_dir, out_dir)
+        pipeline_seconds = time.perf_counter() - start
+
+        calibration = _calibration_ms()
+        results: Dict[str, Any] = {"pipeline_s": pipeline_seconds, "calibration_ms": calibration}
+        for name, options in VARIANTS.items():
+            variant = run_variant(out_dir, tmp_path, name, options, (queries, groups, languages))
+            variant["p50_rel"] = variant["p50_ms"] / calibration
+            variant["p99_rel"] = variant["p99_ms"] / calibration
+            results[name] = variant
+    return results
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    problems = []
+    for name in VARIANTS:
+        if name not in baseline:
+            continue
+        current, previous = results[name], baseline[name]
+        for metric in QUALITY_METRICS:
+            if current[metric] < previous[metric] - MAX_QUALITY_DROP:
+                problems.append(f"{name} {metric} dropped {previous[metric]:.3f} -> {current[metric]:.3f}")
+        if not GATE_LATENCY:
+            continue
+        for metric in ("p50_rel", "p99_rel"):
+            if current[metric] > previous[metric] * MAX_RELATIVE_LATENCY_GROWTH:
+                problems.append(f"{name} {metric} grew {previous[metric]:.3f} -> {current[metric]:.3f}")
+    return problems
+
+
+def _print_results(results: Dict[str, Any]) -> None:
+    for key, value in results.items():
+        if isinstance(value, dict):
+            print(f"[{key}]")
+            for metric, number in value.items():
+                print(f"{metric:>26}: {number:.4g}")
+        else:
+            print(f"{key:>26}: {value:.4g}")
+
+
+if __name__ == "__main__":
+    results = run()
+    _print_results(results)
+    baseline_path = Path(__file__).resolve().parent / BASELINE_FILE
+    if "--update-baseline" in sys.argv[1:]:
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {baseline_path}")
+        sys.exit(0)
+    if not baseline_path.exists():
+        print(f"Missing {baseline_path}; run with --update-baseline and commit it")
+        sys.exit(1)
+    problems = regressions(results, json.loads(baseline_path.read_text(encoding="utf-8")))
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,250 @@
+import hashlib
+import heapq
+import json
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from front_matter import FrontMatter
+from helper_v3 import normalize
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+
+NUM_PERM = 128
+NUM_BANDS = 32
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+# Long documents are MinHashed over their MAX_SHINGLES smallest shingle hashes.
+# The sample is chosen by hash value, so near-identical documents sample the
+# same shingles, and the cost per document stays bounded.
+MAX_SHINGLES = 1024
+SEED = 1
+REPORT_FILE = "duplicates.json"
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(SEED)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+_FRONT_MATTER = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+_LANG_SUFFIX = re.compile(r"-(vn|vi|en)$")
+_VERSION = re.compile(r"v(\d+)\.(\d+)", re.IGNORECASE)
+_VN_SUFFIX = re.compile(r"-(vn|vi)$", re.IGNORECASE)
+# Corporate documents override company ones (agent_role.txt); unscoped
+# regulations and processes are company-level.
+_SCOPE_RANK = {"corporate": 0, "company": 1}
+_LINK_FIELDS = ("children", "parent_regulation", "linked_regulation")
+
+
+def _hash_token(token: str) -> int:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & _MAX_HASH
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[int]:
+    """Hash the word n-grams of a markdown body, ignoring any YAML front matter."""
+    text = _FRONT_MATTER.sub("", text)
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return [_hash_token(" ".join(words))] if words else []
+    return list({_hash_token(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)})
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """Compute the MinHash signature of a document, or None for empty text."""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    if len(hashes) > MAX_SHINGLES:
+        hashes = heapq.nsmallest(MAX_SHINGLES, hashes)
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    matches = sum(1 for a, b in zip(sig_a, sig_b) if a == b)
+    return matches / len(sig_a)
+
+
+def variant_key(name: str) -> str:
+    """Key shared by language variants and version-stamped copies of a document."""
+    base = normalize(Path(name).stem)
+    return _LANG_SUFFIX.sub("", base)
+
+
+def pdf_fingerprint(path: Path) -> Optional[List[int]]:
+    """MinHash the first page of a PDF; None when pypdf is missing or the page has no text."""
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(str(path))
+        if not reader.pages:
+            return None
+        text = reader.pages[0].extract_text() or ""
+    except Exception as exc:
+        print(f"Cannot fingerprint {path}: {exc}")
+        return None
+    return minhash_signature(text)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash index over MinHash signatures."""
+
+    def __init__(self, num_bands: int = NUM_BANDS, threshold: float = SIMILARITY_THRESHOLD):
+        if NUM_PERM % num_bands:
+            raise ValueError(f"{NUM_PERM} permutations cannot be split into {num_bands} bands")
+        self.rows = NUM_PERM // num_bands
+        self.num_bands = num_bands
+        self.threshold = threshold
+        self.signatures: Dict[str, List[int]] = {}
+        self.buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(num_bands)]
+        self._lock = threading.Lock()
+
+    def _bands(self, signature: List[int]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.num_bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def query(self, signature: List[int]) -> List[Tuple[str, float]]:
+        """Return indexed keys whose estimated similarity reaches the threshold."""
+        candidates = set()
+        for band, key in self._bands(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        matches = []
+        for candidate in candidates:
+            score = estimate_similarity(signature, self.signatures[candidate])
+            if score >= self.threshold:
+                matches.append((candidate, score))
+        return sorted(matches, key=lambda item: -item[1])
+
+    def add(self, key: str, signature: List[int]) -> None:
+        self.signatures[key] = signature
+        for band, band_key in self._bands(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def add_if_new(self, key: str, signature: List[int]) -> Optional[str]:
+        """Index a signature unless a near-duplicate exists; return the duplicate's key."""
+        with self._lock:
+            matches = self.query(signature)
+            if matches:
+                return matches[0][0]
+            self.add(key, signature)
+            return None
+
+
+def _union_find_clusters(keys: List[str], pairs: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    parent = {key: key for key in keys}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[str, List[str]] = {}
+    for key in keys:
+        groups.setdefault(find(key), []).append(key)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def find_duplicate_clusters(
+    documents: Dict[str, str],
+    threshold: float = SIMILARITY_THRESHOLD,
+) -> List[List[str]]:
+    """Cluster documents (name -> markdown) whose content is near-identical."""
+    index = LSHIndex(threshold=threshold)
+    pairs = []
+    for name in sorted(documents):
+        signature = minhash_signature(documents[name])
+        if signature is None:
+            continue
+        pairs.extend((name, match) for match, _ in index.query(signature))
+        index.add(name, signature)
+    return _union_find_clusters(sorted(documents), pairs)
+
+
+def find_variant_groups(names: Iterable[str]) -> List[List[str]]:
+    """Group language variants and versioned copies by their normalized name."""
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        groups.setdefault(variant_key(name), []).append(name)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def canonical_key(name: str, text: str) -> Tuple[Tuple[int, int], bool, int, bool, str]:
+    """Sort key choosing the copy to keep from a duplicate cluster.
+
+    Newest version first, then the Vietnamese copy, then corporate over company
+    scope, then a document other documents link to (or that links to them) via
+    children/parent_regulation, so the hierarchy survives dedup. The name only
+    breaks the remaining ties.
+    """
+    front_matter, _ = FrontMatter.parse(text)
+    match = _VERSION.search(Path(name).stem) or _VERSION.search(str(front_matter.get("version", "")))
+    version = (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+    is_vn = bool(_VN_SUFFIX.search(Path(name).stem)) or front_matter.language == "vi"
+    scope_rank = _SCOPE_RANK.get(front_matter.scope, _SCOPE_RANK["company"])
+    linked = any(front_matter.get(field) for field in _LINK_FIELDS)
+    return (-version[0], -version[1]), not is_vn, scope_rank, not linked, name
+
+
+def build_report(input_dir: str, threshold: float = SIMILARITY_THRESHOLD) -> Dict[str, object]:
+    """Scan markdown and report content duplicates and language variants.
+
+    Each cluster is ordered by canonical_key, so its first document is the copy
+    to keep; the rest map to it in ``duplicate_of``. Run it over the generated
+    corpus so pack_corpus can skip the duplicates by path.
+    """
+    root = Path(input_dir)
+    documents = {
+        path.relative_to(root).as_posix(): path.read_text(encoding="utf-8")
+        for path in sorted(root.rglob("*.md"))
+    }
+    clusters = [
+        sorted(cluster, key=lambda name: canonical_key(name, documents[name]))
+        for cluster in find_duplicate_clusters(documents, threshold=threshold)
+    ]
+    duplicate_of = {name: cluster[0] for cluster in clusters for name in cluster[1:]}
+    return {
+        "threshold": threshold,
+        "documents": len(documents),
+        "duplicate_clusters": clusters,
+        "duplicate_of": duplicate_of,
+        "variant_groups": find_variant_groups(documents),
+    }
+
+
+def load_duplicate_map(path: str = REPORT_FILE) -> Dict[str, str]:
+    """Read the ``duplicate_of`` mapping from a saved report, empty if absent."""
+    report_path = Path(path)
+    if not report_path.exists():
+        return {}
+    with open(report_path, "r", encoding="utf-8") as file:
+        return json.load(file).get("duplicate_of", {})
+
+
+if __name__ == "__main__":
+    report = build_report("rag_v5")
+    with open(REPORT_FILE, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(
+        f"{report['documents']} documents, "
+        f"{len(report['duplicate_clusters'])} duplicate clusters, "
+        f"{len(report['variant_groups'])} language/version groups -> {REPORT_FILE}"
+    )
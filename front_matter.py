@@ -0,0 +1,109 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+# Authority implied by the layer when a template does not write authority_level.
+LAYER_AUTHORITY = {
+    "overview": "mandatory",
+    "handbook": "mandatory",
+    "regulation": "mandatory",
+    "process": "mandatory",
+    "job-description": "mandatory",
+    "guideline": "advisory",
+}
+
+
+def _scalar(value: str) -> str:
+    # SEC_REG_HB_TEMPLATE writes "scope: corporate," so trailing commas are dropped.
+    return value.strip().rstrip(",").strip()
+
+
+@dataclass
+class FrontMatter:
+    """Header fields of a generated rag document.
+
+    Parses and serializes the subset of YAML written by the helper_v3
+    templates: ``key: value``, ``- item`` lists and one level of nested
+    ``key: value`` maps, in their original order.
+    """
+
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, text: str) -> Tuple["FrontMatter", str]:
+        """Split a markdown document into its front matter and body."""
+        if not text.startswith("---\n"):
+            return cls(), text
+        end = text.find("\n---", 4)
+        if end == -1:
+            return cls(), text
+        fields: Dict[str, Any] = {}
+        current: Optional[str] = None
+        for line in text[4:end].splitlines():
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if stripped.startswith("- ") and current is not None:
+                if not isinstance(fields[current], list):
+                    fields[current] = []
+                fields[current].append(_scalar(stripped[2:]))
+                continue
+            key, sep, value = line.partition(":")
+            if not sep:
+                continue
+            if line[:1].isspace() and current is not None:
+                if not isinstance(fields[current], dict):
+                    fields[current] = {}
+                fields[current][key.strip()] = _scalar(value)
+                continue
+            current = key.strip()
+            fields[current] = _scalar(value)
+        body = text[end + 4:].lstrip("\n")
+        return cls(fields), body
+
+    def serialize(self) -> str:
+        """Render the fields back into a ``---`` delimited header."""
+        lines = ["---"]
+        for key, value in self.fields.items():
+            if isinstance(value, list):
+                lines.append(f"{key}:")
+                lines.extend(f"  - {item}" for item in value)
+            elif isinstance(value, dict):
+                lines.append(f"{key}:")
+                lines.extend(f"  {sub_key}: {sub_value}" for sub_key, sub_value in value.items())
+            else:
+                lines.append(f"{key}: {value}")
+        lines.append("---")
+        return "\n".join(lines) + "\n"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.fields.get(key, default)
+
+    @property
+    def doc_id(self) -> Optional[str]:
+        return self.fields.get("doc_id") or None
+
+    @property
+    def domain(self) -> str:
+        return self.fields.get("domain", "")
+
+    @property
+    def layer(self) -> str:
+        return self.fields.get("layer", "")
+
+    @property
+    def language(self) -> str:
+        return self.fields.get("language", "")
+
+    @property
+    def scope(self) -> str:
+        return self.fields.get("scope", "")
+
+    @property
+    def authority_level(self) -> str:
+        """Declared authority, falling back to the level implied by the layer."""
+        declared = self.fields.get("authority_level")
+        if declared:
+            return declared
+        if str(self.fields.get("authoritative", "")).lower() == "true":
+            return "mandatory"
+        return LAYER_AUTHORITY.get(self.layer, "")
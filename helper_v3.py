@@ -288,7 +288,7 @@ def create_output_file(name, header, content, out_dir='rag_v5'):
 def process_corp_handbooks(handbook, out_dir='rag_v5', input_dir='out_dir'):
     corperate_handbooks = handbook['corporate']    
     for handbook in corperate_handbooks:
-        if not os.path.exists(input_dir + '\\' + handbook['input']):
+        if not os.path.exists(os.path.join(input_dir, handbook['input'])):
             print(f'\tNo input file {handbook['input']}, skipping')
             continue        
         header = SEC_HB_CORP_TEMPLATE.format(
@@ -298,14 +298,14 @@ def process_corp_handbooks(handbook, out_dir='rag_v5', input_dir='out_dir'):
             lang=handbook['lang']           
         )           
         # print(header)
-        with open(input_dir + '\\' + handbook['input'], 'r', encoding='utf-8') as original_file:
+        with open(os.path.join(input_dir, handbook['input']), 'r', encoding='utf-8') as original_file:
             content = original_file.read()
         create_output_file(handbook['output'], header, content, out_dir=out_dir)
 
 def process_comp_handbooks(handbook, out_dir='rag_v5', input_dir='out_dir'):
      company_handbooks =  handbook['company']
      for handbook in company_handbooks:
-        if not os.path.exists(input_dir + '\\' + handbook['input']):
+        if not os.path.exists(os.path.join(input_dir, handbook['input'])):
             print(f'\tNo input file {handbook['input']}, skipping')
             continue
         header = SEC_HB_COMPANY_TEMPLATE.format(
@@ -313,7 +313,7 @@ def process_comp_handbooks(handbook, out_dir='rag_v5', input_dir='out_dir'):
             doc_class='standard',
             metadata=handbook['metadata'],                    
         )
-        with open(input_dir + '\\' + handbook['input'], 'r', encoding='utf-8') as original_file:
+        with open(os.path.join(input_dir, handbook['input']), 'r', encoding='utf-8') as original_file:
             content = original_file.read()
         create_output_file(handbook['output'], header, content, out_dir=out_dir)
          
@@ -323,8 +323,8 @@ def process_regulations(regulations, out_dir='rag_v5', input_dir='out_dir'):
         for regulation in regulation_items:        
             if "mock" in regulation:
                 reg_intput_content = regulation['input']
-            elif os.path.exists(input_dir + '\\'+ regulation['input']):
-                with open(input_dir + '\\' + regulation['input'], 'r', encoding='utf-8') as original_file:
+            elif os.path.exists(os.path.join(input_dir, regulation['input'])):
+                with open(os.path.join(input_dir, regulation['input']), 'r', encoding='utf-8') as original_file:
                     reg_intput_content = original_file.read()
             else:
                 print(f'\tNo input file {regulation['input']}, skipping')
@@ -382,28 +382,28 @@ def process_regulations(regulations, out_dir='rag_v5', input_dir='out_dir'):
             
             if len(process_contents) > 0:
                 for process_info in process_contents:
-                    if not os.path.exists(input_dir + '\\'+ process_info['input']):
+                    if not os.path.exists(os.path.join(input_dir, process_info['input'])):
                         print(f'\tNo input file {process_info['input']}, skipping')
                         continue
-                    with open(input_dir + '\\' + process_info['input'], 'r', encoding='utf-8') as original_file:
+                    with open(os.path.join(input_dir, process_info['input']), 'r', encoding='utf-8') as original_file:
                         intput_content = original_file.read()
                     create_output_file(process_info['name'], process_info['header'], intput_content, out_dir=out_dir)
                     
 
             if len(guilde_contents) > 0:
                 for guilde_info in guilde_contents:
-                    if not os.path.exists(input_dir + '\\'+ guilde_info['input']):
+                    if not os.path.exists(os.path.join(input_dir, guilde_info['input'])):
                         print(f'\tNo input file {guilde_info['input']}, skipping')
                         continue
-                    with open(input_dir + '\\' + guilde_info['input'], 'r', encoding='utf-8') as original_file:
+                    with open(os.path.join(input_dir, guilde_info['input']), 'r', encoding='utf-8') as original_file:
                         intput_content = original_file.read()
                     create_output_file(guilde_info['name'], guilde_info['header'], intput_content, out_dir=out_dir)
             if len(handbook_contents) > 0:
                 for hb_info in handbook_contents:
-                    if not os.path.exists(input_dir + '\\'+ hb_info['input']):
+                    if not os.path.exists(os.path.join(input_dir, hb_info['input'])):
                         print(f'\tNo input file {hb_info['input']}, skipping')
                         continue
-                    with open(input_dir + '\\' + hb_info['input'], 'r', encoding='utf-8') as original_file:
+                    with open(os.path.join(input_dir, hb_info['input']), 'r', encoding='utf-8') as original_file:
                         intput_content = original_file.read()
                     create_output_file(hb_info['name'], hb_info['header'], intput_content, out_dir=out_dir)
 
@@ -450,19 +450,19 @@ def process_hr(hrcontent, out_dir='rag_v4/hr/', input_dir='out_dir'):
     # print(hr_content)
     if len(jd_contents) > 0:
         for jd_info in jd_contents:
-            if not os.path.exists(input_dir + '\\'+ jd_info['input']):
+            if not os.path.exists(os.path.join(input_dir, jd_info['input'])):
                 print(f'\tNo input file {jd_info['input']}, skipping')
                 continue
-            with open(input_dir + '\\' + jd_info['input'], 'r', encoding='utf-8') as original_file:
+            with open(os.path.join(input_dir, jd_info['input']), 'r', encoding='utf-8') as original_file:
                 intput_content = original_file.read()
             create_output_file(jd_info['name'], jd_info['header'], intput_content, out_dir=out_dir)
     
     if len(hr_content) > 0:
         for hr_info in hr_content:
-            if not os.path.exists(input_dir + '\\'+ hr_info['input']):
+            if not os.path.exists(os.path.join(input_dir, hr_info['input'])):
                 print(f'\tNo input file {hr_info['input']}, skipping')
                 continue
-            with open(input_dir + '\\' + hr_info['input'], 'r', encoding='utf-8') as original_file:
+            with open(os.path.join(input_dir, hr_info['input']), 'r', encoding='utf-8') as original_file:
                 intput_content = original_file.read()
             create_output_file(hr_info['name'], hr_info['header'], intput_content, out_dir=out_dir)
 
@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from front_matter import FrontMatter
+from packed_corpus import PackedCorpus
+
+FACETS = ("domain", "layer", "language", "authority_level", "scope")
+
+FacetQuery = Union[str, Iterable[str]]
+
+
+class FacetIndex:
+    """Bitmap index over front-matter facets.
+
+    Every document gets a position; each (facet, value) pair maps to an int
+    bitmap with that position set. Filters AND bitmaps across facets and OR
+    them within a facet, so no header is parsed at query time.
+    """
+
+    def __init__(self, facets: Iterable[str] = FACETS):
+        self.facets = tuple(facets)
+        self.doc_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in self.facets}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: str, front_matter: FrontMatter) -> None:
+        if doc_id in self.positions:
+            raise ValueError(f"Document {doc_id} is already indexed")
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.positions[doc_id] = position
+        bit = 1 << position
+        for facet in self.facets:
+            value = getattr(front_matter, facet, None) or front_matter.get(facet)
+            if not isinstance(value, str) or not value:
+                continue
+            values = self.bitmaps[facet]
+            values[value] = values.get(value, 0) | bit
+
+    def values(self, facet: str) -> Dict[str, int]:
+        """Return the document count for each value of a facet."""
+        return {value: bin(bitmap).count("1") for value, bitmap in self.bitmaps[facet].items()}
+
+    def bitmap(self, **query: FacetQuery) -> int:
+        """Intersect facet bitmaps; a facet may be given one value or several."""
+        result = (1 << len(self.doc_ids)) - 1
+        for facet, wanted in query.items():
+            if facet not in self.bitmaps:
+                raise KeyError(f"Unknown facet {facet}; indexed facets are {self.facets}")
+            if isinstance(wanted, str):
+                wanted = (wanted,)
+            facet_bitmap = 0
+            for value in wanted:
+                facet_bitmap |= self.bitmaps[facet].get(value, 0)
+            result &= facet_bitmap
+            if not result:
+                break
+        return result
+
+    def filter(self, **query: FacetQuery) -> List[str]:
+        """Return the ids of documents matching every facet in the query."""
+        return self.ids_of(self.bitmap(**query))
+
+    def ids_of(self, bitmap: int) -> List[str]:
+        doc_ids = []
+        while bitmap:
+            low_bit = bitmap & -bitmap
+            doc_ids.append(self.doc_ids[low_bit.bit_length() - 1])
+            bitmap ^= low_bit
+        return doc_ids
+
+
+def build_from_pack(corpus: PackedCorpus, facets: Iterable[str] = FACETS) -> FacetIndex:
+    """Index the pre-parsed front matter stored in a packed corpus."""
+    index = FacetIndex(facets)
+    for doc_id in corpus:
+        index.add(doc_id, corpus.metadata(doc_id))
+    return index
+
+
+def build_from_dir(corpus_dir: str, facets: Iterable[str] = FACETS) -> FacetIndex:
+    """Index the front matter of every markdown file under corpus_dir."""
+    index = FacetIndex(facets)
+    for path in sorted(Path(corpus_dir).rglob("*.md")):
+        front_matter, _ = FrontMatter.parse(path.read_text(encoding="utf-8"))
+        doc_id = front_matter.doc_id or path.stem
+        if doc_id in index.positions:
+            print(f"\tSKIP duplicate doc_id {doc_id}: {path}")
+            continue
+        index.add(doc_id, front_matter)
+    return index
+
+
+if __name__ == "__main__":
+    index = build_from_dir("rag_v5")
+    print(f"Indexed {len(index)} documents")
+    for facet in index.facets:
+        print(f"  {facet}: {index.values(facet)}")
+    matches = index.filter(domain="security", layer="regulation", language="vi", authority_level="mandatory")
+    print(f"Mandatory Vietnamese security regulations: {len(matches)}")
@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from dedup import REPORT_FILE, load_duplicate_map
+from front_matter import FrontMatter
+
+CORPUS_DIR = "rag_v5"
+PACK_FILE = "rag_v5.pack"
+
+MAGIC = b"ISOPACK1"
+FORMAT_VERSION = 1
+COMPRESSION_LEVEL = 6
+# magic, format version, index offset, index length
+HEADER = struct.Struct("<8sIQQ")
+
+
+def _versioned_packs(pack_file: str) -> List[Tuple[int, Path]]:
+    """Builds of pack_file on disk as (build number, path), oldest first."""
+    base = Path(pack_file)
+    builds = []
+    for path in base.parent.glob(f"{base.stem}.*{base.suffix}"):
+        build = path.name[len(base.stem) + 1:-len(base.suffix)]
+        if build.isdigit():
+            builds.append((int(build), path))
+    return sorted(builds)
+
+
+def latest_pack(pack_file: str = PACK_FILE) -> str:
+    """Path of the newest build of pack_file, or pack_file itself if it was never versioned."""
+    builds = _versioned_packs(pack_file)
+    return str(builds[-1][1]) if builds else pack_file
+
+
+def _remove_old_packs(pack_file: str, keep: Path) -> None:
+    for _, path in _versioned_packs(pack_file):
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            # Still mapped by a reader (Windows); removed on a later rebuild.
+            pass
+
+
+def _warn_broken_links(entries: List[Dict[str, Any]]) -> None:
+    packed = {entry["doc_id"] for entry in entries}
+    for entry in entries:
+        front_matter = entry["front_matter"]
+        links = front_matter.get("children") or []
+        if isinstance(links, str):
+            links = [links]
+        links = list(links) + [front_matter.get("parent_regulation") or ""]
+        for link in links:
+            if link and link not in packed:
+                print(f"\tWARNING {entry['doc_id']} links to {link}, which is not in the pack")
+
+
+def pack_corpus(
+    corpus_dir: str = CORPUS_DIR,
+    pack_file: str = PACK_FILE,
+    duplicates_file: str = REPORT_FILE,
+) -> int:
+    """Pack every markdown file under corpus_dir into a single indexed container.
+
+    Documents listed in the dedup report's ``duplicate_of`` map are left out
+    when their canonical copy is packed; their doc_ids are recorded under
+    ``duplicates`` in the canonical copy's front matter. If the canonical copy
+    is gone, the report is stale and the document is packed anyway.
+
+    Each build goes to a new file, ``<stem>.<build>.pack`` next to pack_file,
+    and never replaces a file in place: Windows refuses to replace or delete a
+    file that a reader has mmapped. PackedCorpus opens the newest build, and
+    readers re-open when prompt_assembler.corpus_version() changes. Older
+    builds are removed once no reader holds them.
+    """
+    root = Path(corpus_dir)
+    duplicate_of = load_duplicate_map(duplicates_file)
+    entries: List[Dict[str, Any]] = []
+    skipped: Dict[str, List[str]] = {}
+    seen = set()
+    base = Path(pack_file)
+    build_file = base.with_name(f"{base.stem}.{time.time_ns()}{base.suffix}")
+    tmp_file = f"{build_file}.tmp"
+    paths = sorted(root.rglob("*.md"))
+    present = {path.relative_to(root).as_posix() for path in paths}
+    with open(tmp_file, "wb") as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        for path in paths:
+            front_matter, body = FrontMatter.parse(path.read_text(encoding="utf-8"))
+            doc_id = front_matter.doc_id or path.stem
+            relative_path = path.relative_to(root).as_posix()
+            canonical = duplicate_of.get(relative_path)
+            if canonical is not None:
+                if canonical in present and canonical not in duplicate_of:
+                    print(f"\tSKIP near-duplicate {relative_path} of {canonical}")
+                    skipped.setdefault(canonical, []).append(doc_id)
+                    continue
+                print(f"\tWARNING stale {duplicates_file}: {canonical} is not packed, keeping {relative_path}")
+            if doc_id in seen:
+                print(f"\tSKIP duplicate doc_id {doc_id}: {path}")
+                continue
+            seen.add(doc_id)
+            raw = body.encode("utf-8")
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            entries.append({
+                "doc_id": doc_id,
+                "path": relative_path,
+                "offset": out.tell(),
+                "length": len(compressed),
+                "raw_length": len(raw),
+                "front_matter": front_matter.fields,
+            })
+            out.write(compressed)
+        for entry in entries:
+            if entry["path"] in skipped:
+                entry["front_matter"]["duplicates"] = skipped[entry["path"]]
+        _warn_broken_links(entries)
+        index = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+        index_offset = out.tell()
+        out.write(index)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, index_offset, len(index)))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_file, build_file)
+    _remove_old_packs(pack_file, build_file)
+    return len(entries)
+
+
+class PackedCorpus:
+    """Read-only, memory-mapped view of a packed corpus.
+
+    Opening reads only the index of the newest build of pack_file; each body
+    is decompressed on access.
+    """
+
+    def __init__(self, pack_file: str = PACK_FILE):
+        self.path = Path(latest_pack(pack_file))
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, index_offset, index_length = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} corpus pack")
+            index = json.loads(self._mm[index_offset:index_offset + index_length])
+        except Exception:
+            self.close()
+            raise
+        self._entries: Dict[str, Dict[str, Any]] = {entry["doc_id"]: entry for entry in index}
+
+    def __enter__(self) -> "PackedCorpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def close(self) -> None:
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+        self._file.close()
+
+    def metadata(self, doc_id: str) -> FrontMatter:
+        """Return the pre-parsed front matter of a document."""
+        return FrontMatter(self._entries[doc_id]["front_matter"])
+
+    def path_of(self, doc_id: str) -> str:
+        """Return the document's path relative to the packed corpus directory."""
+        return self._entries[doc_id]["path"]
+
+    def read(self, doc_id: str) -> str:
+        """Decompress and return the markdown body of a single document."""
+        entry = self._entries[doc_id]
+        start = entry["offset"]
+        return zlib.decompress(self._mm[start:start + entry["length"]]).decode("utf-8")
+
+
+if __name__ == "__main__":
+    count = pack_corpus()
+    print(f"Packed {count} documents from {CORPUS_DIR} into {latest_pack(PACK_FILE)}")
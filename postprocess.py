@@ -0,0 +1,276 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Separators the extraction API and common converters put between pages.
+PAGE_BREAK = re.compile(r"^\s*(<!--\s*page[^>]*-->|\f|\\pagebreak)\s*$", re.IGNORECASE)
+PAGE_NUMBER = re.compile(
+    r"^\s*(?:(?:page|trang)\s*\d+(?:\s*(?:/|of|trên)\s*\d+)?|\d+\s*/\s*\d+|-?\s*\d{1,4}\s*-?)\s*$",
+    re.IGNORECASE,
+)
+TABLE_SEPARATOR_CELL = re.compile(r"^:?-+:?$")
+LIST_ITEM = re.compile(r"^([-*+]|\d+[.)])\s")
+HORIZONTAL_RULE = re.compile(r"^([-*_])(\s*\1){2,}$")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+MAX_BOILERPLATE_LENGTH = 120
+# Running headers, footers and page numbers sit within this many non-blank
+# lines of a page's top or bottom.
+EDGE_LINES = 3
+
+
+@dataclass(frozen=True)
+class CleanupConfig:
+    """Switches for one document class; see DOC_CLASS_CONFIGS."""
+
+    strip_repeated_lines: bool = True
+    min_repeats: int = 3
+    strip_page_numbers: bool = True
+    drop_duplicate_pages: bool = True
+    normalize_tables: bool = True
+    collapse_whitespace: bool = True
+
+
+DEFAULT_CONFIG = CleanupConfig()
+
+# Keyed by helper_v3.classify_doc(); unlisted classes use DEFAULT_CONFIG.
+DOC_CLASS_CONFIGS: Dict[str, CleanupConfig] = {
+    # Infographics are short and label-heavy; repeated labels are content.
+    "infographic": CleanupConfig(strip_repeated_lines=False, normalize_tables=False),
+    # Whitepapers repeat section names in running text more often.
+    "whitepaper": CleanupConfig(min_repeats=5),
+}
+
+
+@dataclass
+class CleanupStats:
+    bytes_before: int
+    bytes_after: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self) -> str:
+        return (
+            f"saved {self.bytes_saved} bytes ({self.bytes_before} -> {self.bytes_after}), "
+            f"~{self.tokens_saved} tokens ({self.tokens_before} -> {self.tokens_after})"
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: words plus punctuation marks."""
+    return len(TOKEN.findall(text))
+
+
+def _split_lines(text: str) -> List[str]:
+    """Split on newlines only; str.splitlines() would swallow form-feed page breaks."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.replace("\f", "\n\f\n").split("\n")
+
+
+def _split_pages(lines: List[str]) -> List[List[str]]:
+    pages: List[List[str]] = [[]]
+    for line in lines:
+        if PAGE_BREAK.match(line):
+            pages.append([])
+        else:
+            pages[-1].append(line)
+    return pages
+
+
+def _page_key(page: List[str]) -> str:
+    return " ".join(" ".join(page).split())
+
+
+def _drop_duplicate_pages(pages: List[List[str]]) -> Iterator[List[str]]:
+    seen = set()
+    for page in pages:
+        key = _page_key(page)
+        if key and key in seen:
+            continue
+        seen.add(key)
+        yield page
+
+
+def _is_structural(line: str) -> bool:
+    stripped = line.strip()
+    return (
+        stripped.startswith(("|", "#", "```"))
+        or bool(LIST_ITEM.match(stripped))
+        or bool(HORIZONTAL_RULE.match(stripped))
+    )
+
+
+def _edge_lines(pages: List[List[str]]) -> List[List[int]]:
+    """Indexes of the top and bottom non-blank lines of each page, outside code fences.
+
+    Structural lines are excluded unless they are page numbers.
+    """
+    edges: List[List[int]] = []
+    in_code = False
+    for page in pages:
+        prose = []
+        for index, line in enumerate(page):
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+                continue
+            if in_code or not line.strip():
+                continue
+            # "- 5 -" looks like a list item but is a page number.
+            if PAGE_NUMBER.match(line) or not _is_structural(line):
+                prose.append(index)
+        non_blank = [index for index, line in enumerate(page) if line.strip()]
+        edge = set(non_blank[:EDGE_LINES] + non_blank[-EDGE_LINES:])
+        edges.append([index for index in prose if index in edge])
+    return edges
+
+
+def _repeated_edge_lines(pages: List[List[str]], edges: List[List[int]], min_repeats: int) -> set:
+    """Short page-edge lines that occur on at least min_repeats pages."""
+    counts: Counter = Counter()
+    for page, indexes in zip(pages, edges):
+        counts.update({
+            page[index].strip()
+            for index in indexes
+            if len(page[index].strip()) <= MAX_BOILERPLATE_LENGTH
+        })
+    return {line for line, count in counts.items() if count >= min_repeats}
+
+
+def _table_cells(row: str) -> List[str]:
+    return [cell.strip() for cell in row.strip().strip("|").split("|")]
+
+
+def _normalize_tables(lines: Iterable[str]) -> Iterator[str]:
+    """Rejoin table rows broken across lines and pad rows to the header width.
+
+    A row is only treated as broken when it has fewer cells than the header;
+    it absorbs following lines while they contain a cell separator and do not
+    start a new row. A missing closing pipe alone is valid GFM. Lines inside
+    code fences are passed through unchanged.
+    """
+    width = 0
+    pending = ""
+
+    def format_row(row: str) -> str:
+        cells = _table_cells(row)
+        filler = "---" if all(TABLE_SEPARATOR_CELL.match(cell) for cell in cells) else ""
+        if len(cells) < width:
+            cells += [filler] * (width - len(cells))
+        return "| " + " | ".join(cells) + " |"
+
+    in_code = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("```") or in_code:
+            if pending:
+                yield format_row(pending)
+                pending = ""
+            if stripped.startswith("```"):
+                in_code = not in_code
+            width = 0
+            yield line
+            continue
+        if pending:
+            if stripped and "|" in stripped and not stripped.startswith("|"):
+                pending = pending + " " + stripped
+                if len(_table_cells(pending)) >= width:
+                    yield format_row(pending)
+                    pending = ""
+                continue
+            yield format_row(pending)
+            pending = ""
+        if not stripped.startswith("|"):
+            width = 0
+            yield line
+            continue
+        cells = len(_table_cells(stripped))
+        if not width:
+            width = cells
+        elif cells < width:
+            pending = stripped
+            continue
+        yield format_row(stripped)
+    if pending:
+        yield format_row(pending)
+
+
+def _collapse_whitespace(lines: Iterable[str]) -> Iterator[str]:
+    in_code = False
+    blank = True
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        if in_code:
+            blank = False
+            yield line.rstrip()
+            continue
+        line = line.rstrip()
+        if not line.strip():
+            if blank:
+                continue
+            blank = True
+            yield ""
+            continue
+        blank = False
+        indent = len(line) - len(line.lstrip(" "))
+        yield line[:indent] + re.sub(r"[ \t]{2,}", " ", line[indent:])
+
+
+def clean_markdown(text: str, doc_class: str = "document") -> Tuple[str, CleanupStats]:
+    """Strip OCR boilerplate from extracted markdown and report the savings.
+
+    Lines are pushed through a chain of generators: duplicate pages are dropped,
+    headers/footers repeated at page edges and page numbers are removed (only
+    when the text has page breaks, and never inside code fences, lists, tables,
+    headings or rules), tables are normalized, and runs of whitespace are
+    collapsed, each stage switched by the class config. Run it once per
+    document, on the raw extraction output that still has its page breaks.
+    """
+    config = DOC_CLASS_CONFIGS.get(doc_class, DEFAULT_CONFIG)
+    pages = _split_pages(_split_lines(text))
+    if config.drop_duplicate_pages and len(pages) > 1:
+        pages = list(_drop_duplicate_pages(pages))
+    # Without page breaks there is no page edge to anchor headers and footers on.
+    paginated = len(pages) > 1
+    edges = _edge_lines(pages) if paginated else [[] for _ in pages]
+    boilerplate = (
+        _repeated_edge_lines(pages, edges, config.min_repeats)
+        if paginated and config.strip_repeated_lines
+        else set()
+    )
+
+    def kept_lines() -> Iterator[str]:
+        for page_index, (page, edge) in enumerate(zip(pages, edges)):
+            if page_index:
+                yield ""
+            edge = set(edge)
+            for index, line in enumerate(page):
+                if index in edge:
+                    if line.strip() in boilerplate:
+                        continue
+                    if config.strip_page_numbers and PAGE_NUMBER.match(line):
+                        continue
+                yield line
+
+    lines: Iterable[str] = kept_lines()
+    if config.normalize_tables:
+        lines = _normalize_tables(lines)
+    if config.collapse_whitespace:
+        lines = _collapse_whitespace(lines)
+    cleaned = "\n".join(lines).strip("\n") + "\n"
+
+    stats = CleanupStats(
+        bytes_before=len(text.encode("utf-8")),
+        bytes_after=len(cleaned.encode("utf-8")),
+        tokens_before=estimate_tokens(text),
+        tokens_after=estimate_tokens(cleaned),
+    )
+    return cleaned, stats
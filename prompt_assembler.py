@@ -0,0 +1,253 @@
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from front_matter import FrontMatter
+from packed_corpus import latest_pack
+from postprocess import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+# Order matters: the prefix must be byte-identical across requests for the
+# provider's prompt cache to hit.
+PROMPT_ASSETS = (
+    "agent_role.txt",
+    "agent_objective.txt",
+    "agent_context.txt",
+    "agent_expected_output.txt",
+)
+
+MAX_PROMPT_TOKENS = 16000
+RESERVED_OUTPUT_TOKENS = 2000
+QUERY_CACHE_TTL_SECONDS = 600
+QUERY_CACHE_SIZE = 256
+TOKENIZER_ENCODING = "cl100k_base"
+# Relevance gate applied before authority ordering: at most CONTEXT_TOP_K
+# chunks, each scoring at least MIN_SCORE_RATIO of the best one.
+CONTEXT_TOP_K = 8
+MIN_SCORE_RATIO = 0.3
+
+# Precedence from agent_role.txt: corporate handbooks, company handbooks,
+# regulations, processes, guidelines. HR job descriptions sit with processes.
+AUTHORITY_ORDER = {
+    ("handbook", "corporate"): 0,
+    ("handbook", "company"): 1,
+    ("overview", ""): 2,
+    ("regulation", ""): 2,
+    ("process", ""): 3,
+    ("job-description", ""): 3,
+    ("guideline", ""): 4,
+}
+PREFERRED_LANGUAGE = "vi"
+
+
+@dataclass
+class Chunk:
+    doc_id: str
+    text: str
+    front_matter: FrontMatter = field(default_factory=FrontMatter)
+    score: float = 0.0
+
+    @property
+    def authority_rank(self) -> int:
+        layer = self.front_matter.layer
+        scope = self.front_matter.scope if layer == "handbook" else ""
+        return AUTHORITY_ORDER.get((layer, scope), len(AUTHORITY_ORDER))
+
+    def render(self) -> str:
+        fm = self.front_matter
+        return (
+            f'<document id="{self.doc_id}" layer="{fm.layer}" scope="{fm.scope}" '
+            f'language="{fm.language}" authority="{fm.authority_level}">\n'
+            f"{self.text.strip()}\n</document>"
+        )
+
+
+@dataclass
+class AssembledPrompt:
+    system: str
+    user: str
+    chunks: List[Chunk]
+    tokens: int
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user},
+        ]
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as exc:
+        print(f"Falling back to estimated token counts: {exc}")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, else estimate; results are cached."""
+    encoder = _encoder()
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text))
+
+
+@lru_cache(maxsize=1)
+def static_prefix(assets_dir: Path = ASSETS_DIR) -> str:
+    """Concatenate the agent prompt assets once into a byte-stable system prompt."""
+    sections = []
+    for name in PROMPT_ASSETS:
+        text = (assets_dir / name).read_text(encoding="utf-8")
+        sections.append(text.replace("\r\n", "\n").strip())
+    return "\n\n".join(sections) + "\n"
+
+
+def select_chunks(chunks: List[Chunk], top_k: int = CONTEXT_TOP_K) -> List[Chunk]:
+    """Keep the most relevant chunks: top_k by score, above the score floor."""
+    by_score = sorted(chunks, key=lambda chunk: -chunk.score)[:top_k]
+    if not by_score:
+        return []
+    floor = by_score[0].score * MIN_SCORE_RATIO
+    return [chunk for chunk in by_score if chunk.score >= floor]
+
+
+def rank_chunks(chunks: List[Chunk]) -> List[Chunk]:
+    """Order chunks by authority, then Vietnamese first, then retrieval score."""
+    return sorted(
+        chunks,
+        key=lambda chunk: (
+            chunk.authority_rank,
+            chunk.front_matter.language != PREFERRED_LANGUAGE,
+            -chunk.score,
+        ),
+    )
+
+
+def pack_chunks(chunks: List[Chunk], budget: int) -> Tuple[List[Chunk], int]:
+    """Fill the token budget with the most relevant chunks, then order them by authority.
+
+    Relevance decides what gets in; authority and language only decide the
+    order the selected chunks are presented in.
+    """
+    packed: List[Chunk] = []
+    used = 0
+    for chunk in select_chunks(chunks):
+        cost = count_tokens(chunk.render())
+        if used + cost > budget:
+            continue
+        packed.append(chunk)
+        used += cost
+    return rank_chunks(packed), used
+
+
+def corpus_version(pack_file: str) -> Tuple[str, int, int]:
+    """Identify the newest corpus build by its pack file's path, mtime and size."""
+    path = latest_pack(pack_file)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+class QueryCache:
+    """TTL cache of retrieval results, emptied when the corpus version changes."""
+
+    def __init__(
+        self,
+        version: Callable[[], Any],
+        ttl: float = QUERY_CACHE_TTL_SECONDS,
+        max_size: int = QUERY_CACHE_SIZE,
+    ):
+        self._version = version
+        self._current_version = version()
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[str, Tuple[float, List[Chunk]]] = {}
+
+    @staticmethod
+    def key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _check_version(self) -> None:
+        version = self._version()
+        if version != self._current_version:
+            self._current_version = version
+            self._entries.clear()
+
+    def get(self, question: str) -> Optional[List[Chunk]]:
+        self._check_version()
+        key = self.key(question)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, chunks = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        return chunks
+
+    def put(self, question: str, chunks: List[Chunk]) -> None:
+        self._check_version()
+        if len(self._entries) >= self.max_size:
+            oldest = min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest]
+        self._entries[self.key(question)] = (time.monotonic(), chunks)
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+
+class PromptAssembler:
+    """Build agent prompts from the static prefix plus budgeted retrieved chunks."""
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], List[Chunk]],
+        cache: Optional[QueryCache] = None,
+        max_prompt_tokens: int = MAX_PROMPT_TOKENS,
+        reserved_output_tokens: int = RESERVED_OUTPUT_TOKENS,
+    ):
+        self.retrieve = retrieve
+        self.cache = cache
+        self.system = static_prefix()
+        self.system_tokens = count_tokens(self.system)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.reserved_output_tokens = reserved_output_tokens
+
+    def _retrieve(self, question: str) -> List[Chunk]:
+        if self.cache is None:
+            return self.retrieve(question)
+        chunks = self.cache.get(question)
+        if chunks is None:
+            chunks = self.retrieve(question)
+            self.cache.put(question, chunks)
+        return chunks
+
+    def assemble(self, question: str) -> AssembledPrompt:
+        question_block = f"Câu hỏi: {question.strip()}"
+        budget = (
+            self.max_prompt_tokens
+            - self.reserved_output_tokens
+            - self.system_tokens
+            - count_tokens(question_block)
+        )
+        chunks, used = pack_chunks(self._retrieve(question), max(budget, 0))
+        context = "\n\n".join(chunk.render() for chunk in chunks)
+        user = f"{context}\n\n{question_block}" if context else question_block
+        return AssembledPrompt(
+            system=self.system,
+            user=user,
+            chunks=chunks,
+            tokens=self.system_tokens + used + count_tokens(question_block),
+        )
@@ -0,0 +1,73 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from metadata_index import FacetQuery, build_from_pack
+from packed_corpus import PackedCorpus
+from prompt_assembler import Chunk
+
+WORD = re.compile(r"\w+")
+SECTION_BREAK = re.compile(r"^(?=#{1,3} )", re.MULTILINE)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD.findall(text.lower())
+
+
+def split_sections(body: str) -> List[str]:
+    """Split a markdown body into heading-led sections."""
+    return [section.strip() for section in SECTION_BREAK.split(body) if section.strip()]
+
+
+class Retriever:
+    """BM25 over heading sections of a packed corpus, filtered by facets first.
+
+    With sectioned=False each document is scored as a single unit.
+    """
+
+    def __init__(self, corpus: PackedCorpus, sectioned: bool = True):
+        self.corpus = corpus
+        self.facets = build_from_pack(corpus)
+        self.sections: List[Tuple[str, str]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id in corpus:
+            body = corpus.read(doc_id)
+            for text in split_sections(body) if sectioned else [body]:
+                position = len(self.sections)
+                terms = Counter(tokenize(text))
+                self.sections.append((doc_id, text))
+                self.lengths.append(sum(terms.values()))
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, []).append((position, tf))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.sections) - df + 0.5) / (df + 0.5))
+
+    def search(self, question: str, k: int = 10, **facets: FacetQuery) -> List[Chunk]:
+        """Return the k best sections, restricted to documents matching the facets."""
+        allowed = self.facets.bitmap(**facets) if facets else None
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(question)):
+            idf = self._idf(term)
+            for position, tf in self.postings.get(term, ()):
+                doc_id = self.sections[position][0]
+                if allowed is not None and not allowed >> self.facets.positions[doc_id] & 1:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / self.average_length)
+                scores[position] = scores.get(position, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        return [
+            Chunk(
+                doc_id=self.sections[position][0],
+                text=self.sections[position][1],
+                front_matter=self.corpus.metadata(self.sections[position][0]),
+                score=score,
+            )
+            for position, score in best
+        ]